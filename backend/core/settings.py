@@ -201,6 +201,13 @@ CACHES = {
 # Cache time to live is 15 minutes
 CACHE_TTL = 60 * 15
 
+# Cache stampede protection: how long a rebuild lock is held at most, how
+# long other requests wait for the rebuilt entry before querying the database
+# themselves, and how often they check the cache while waiting
+CACHE_LOCK_TIMEOUT = 10
+CACHE_LOCK_BLOCKING_TIMEOUT = 5
+CACHE_LOCK_POLL_INTERVAL = 0.05
+
 # Session Engine - Using cache for sessions
 SESSION_ENGINE = "django.contrib.sessions.backends.cache"
 SESSION_CACHE_ALIAS = "default"
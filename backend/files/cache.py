@@ -1,53 +1,163 @@
 import logging
 from django.core.cache import cache
 from django.conf import settings
+from django.db import transaction
 import hashlib
 import json
+import msgpack
+import time
 
 logger = logging.getLogger(__name__)
 
 class FileListCache:
+    # Generation counter mixed into every list cache key. Bumping it makes all
+    # previously cached pages unreachable.
+    REVISION_KEY = "file_list:rev"
+    # Separate counter that only moves when links between duplicates and
+    # their originals change
+    DUPLICATES_REVISION_KEY = "file_list:duplicates_rev"
+    # All cached pages live as fields of this one Redis hash, so they can be
+    # dropped together with a single command. Pages only hold JSON-compatible
+    # data, so they are stored as msgpack rather than the cache's pickle.
+    GROUP_KEY = "file_list_cache"
+    # Store a page and start the group's TTL only if it has none yet. Hash
+    # fields can't expire individually, so the whole group expires CACHE_TTL
+    # after its first write; later writes must not extend it, which would let
+    # stale pages and the number of cached pages grow for as long as traffic
+    # continues. Checked in Lua since EXPIRE NX needs Redis 7.
+    SET_SCRIPT = """
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+if redis.call('TTL', KEYS[1]) == -1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[3])
+end
+"""
+    _set_script = None
+
+    @staticmethod
+    def get_revision(key=REVISION_KEY):
+        """Return the current file list cache revision"""
+        return cache.get_or_set(
+            key,
+            lambda: int(time.time() * 1000),
+            timeout=None
+        )
+
+    @staticmethod
+    def bump_revision(key=REVISION_KEY):
+        """Invalidate everything keyed by a revision with a single INCR"""
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # Revision key is missing (evicted or never set); a fresh timestamp
+            # is guaranteed to differ from any revision used so far
+            revision = int(time.time() * 1000)
+            cache.set(key, revision, timeout=None)
+            return revision
+
+    @staticmethod
+    def invalidate(duplicates=False):
+        """Invalidate all cached file lists and release the memory they use"""
+        FileListCache.bump_revision()
+        if duplicates:
+            FileListCache.bump_revision(FileListCache.DUPLICATES_REVISION_KEY)
+        try:
+            cache.client.get_client(write=True).unlink(cache.make_key(FileListCache.GROUP_KEY))
+        except Exception as e:
+            logger.error(f"Error clearing file list cache: {str(e)}")
+
+    @staticmethod
+    def get_etag(revision):
+        """Weak ETag for responses derived from the given revision"""
+        return f'W/"{revision}"'
+
+    @staticmethod
+    def canonicalize_filters(filters):
+        """Normalize filter values so equivalent requests share a cache key"""
+        canonical = {}
+        for name, value in sorted(filters.items()):
+            if value is None:
+                continue
+            value = str(value).strip()
+            if name == 'is_duplicate':
+                # Mirrors django-filter's BooleanWidget; other values don't filter
+                value = {'1': '1', 'true': '1', '0': '0', 'false': '0'}.get(value.lower())
+            if value:
+                canonical[name] = value
+        return canonical
+
+    @staticmethod
+    def invalidate_on_commit(duplicates=False):
+        """
+        Invalidate once the current transaction commits. Bumping earlier would
+        let a concurrent reader cache pre-commit data under the new revision.
+        """
+        transaction.on_commit(lambda: FileListCache.invalidate(duplicates=duplicates))
+
     @staticmethod
-    def generate_cache_key(filters, page, page_size, ordering):
-        """Generate a unique cache key based on filters and pagination"""
-        # Create a dictionary of all parameters
-        cache_dict = {
-            'filters': filters,
-            'page': page,
-            'page_size': page_size,
-            'ordering': ordering
-        }
-        
-        # Convert to a sorted JSON string to ensure consistent ordering
-        cache_string = json.dumps(cache_dict, sort_keys=True)
-        
-        # Create an MD5 hash of the string
-        key = f"file_hub:file_list:{hashlib.md5(cache_string.encode()).hexdigest()}"
-        logger.info(f"Generated cache key: {key}")
+    def generate_cache_key(filters, page, page_size, ordering, revision=None):
+        """Generate a unique cache key based on filters, pagination and the current revision"""
+        page = str(page).strip()
+        key_material = json.dumps({
+            'f': FileListCache.canonicalize_filters(filters),
+            'p': int(page) if page.isdigit() else page,
+            'ps': int(page_size),
+            'o': (ordering or '').strip()
+        }, sort_keys=True)
+
+        # Hash the canonical form to keep key length bounded
+        if revision is None:
+            revision = FileListCache.get_revision()
+        key = f"file_list:{revision}:{hashlib.sha1(key_material.encode()).hexdigest()}"
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Generated cache key: %s", key)
         return key
 
+    @staticmethod
+    def get_lock(cache_key):
+        """Return a distributed lock guarding the rebuild of a cache entry"""
+        return cache.lock(f"lock:{cache_key}", timeout=settings.CACHE_LOCK_TIMEOUT)
+
+    @staticmethod
+    def release_lock(lock):
+        """Release a lock, ignoring locks that already expired"""
+        try:
+            lock.release()
+        except Exception as e:
+            logger.error(f"Error releasing cache lock: {str(e)}")
+
     @staticmethod
     def get_cached_data(cache_key):
-        """Retrieve data from cache"""
-        data = cache.get(cache_key)
-        if data is not None:
-            logger.info(f"Cache hit for key: {cache_key}")
-        else:
-            logger.info(f"Cache miss for key: {cache_key}")
-        return data
+        """Retrieve data from the file list cache hash"""
+        try:
+            client = cache.client.get_client(write=False)
+            value = client.hget(cache.make_key(FileListCache.GROUP_KEY), cache_key)
+        except Exception as e:
+            logger.error(f"Error reading data from cache: {str(e)}")
+            return None
+
+        if value is None:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Cache miss for key: %s", cache_key)
+            return None
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Cache hit for key: %s", cache_key)
+        return msgpack.unpackb(value, raw=False)
 
     @staticmethod
     def set_cached_data(cache_key, data):
-        """Store data in cache"""
+        """Store data in the file list cache hash"""
+        group_key = cache.make_key(FileListCache.GROUP_KEY)
         try:
-            cache.set(cache_key, data, timeout=settings.CACHE_TTL)
-            logger.info(f"Data stored in cache with key: {cache_key}")
-            
-            # Verify the data was stored
-            verification = cache.get(cache_key)
-            if verification is not None:
-                logger.info(f"Cache storage verified for key: {cache_key}")
-            else:
-                logger.error(f"Cache storage verification failed for key: {cache_key}")
+            client = cache.client.get_client(write=True)
+            # Registered once; redis-py calls it with EVALSHA and reloads it if needed
+            if FileListCache._set_script is None:
+                FileListCache._set_script = client.register_script(FileListCache.SET_SCRIPT)
+            FileListCache._set_script(
+                keys=[group_key],
+                args=[cache_key, msgpack.packb(data, use_bin_type=True), settings.CACHE_TTL],
+                client=client
+            )
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Data stored in cache with key: %s", cache_key)
         except Exception as e:
             logger.error(f"Error storing data in cache: {str(e)}")
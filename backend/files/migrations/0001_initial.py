@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-15 09:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='File',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('original_filename', models.CharField(max_length=255)),
+                ('file_type', models.CharField(max_length=100)),
+                ('size', models.BigIntegerField()),
+                ('uploaded_at', models.DateTimeField(auto_now_add=True)),
+                ('file_hash', models.CharField(db_index=True, max_length=64)),
+                ('is_duplicate', models.BooleanField(default=False)),
+                ('file_content', models.BinaryField(null=True)),
+                ('original_file', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicates', to='files.file')),
+            ],
+            options={
+                'ordering': ['-uploaded_at'],
+            },
+        ),
+    ]
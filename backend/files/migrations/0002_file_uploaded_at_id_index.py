@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-15 09:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('files', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='file',
+            index=models.Index(fields=['uploaded_at', 'id'], name='files_file_uploade_964dac_idx'),
+        ),
+    ]
@@ -33,6 +33,10 @@ class File(models.Model):
     
     class Meta:
         ordering = ['-uploaded_at']
+        indexes = [
+            # Supports keyset pagination on (uploaded_at, id)
+            models.Index(fields=['uploaded_at', 'id']),
+        ]
     
     def __str__(self):
         return self.original_filename
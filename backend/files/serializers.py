@@ -1,3 +1,4 @@
+from django.urls import reverse
 from rest_framework import serializers
 from .models import File
 
@@ -28,4 +29,28 @@ class FileSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         if request is None:
             return None
-        return request.build_absolute_uri(f'/api/files/{obj.id}/download/')
\ No newline at end of file
+        return request.build_absolute_uri(f'/api/files/{obj.id}/download/')
+
+
+# Model columns behind FileSerializer's output, for code paths that read rows
+# with .values() instead of instantiating models
+FILE_VALUES_FIELDS = [field for field in FileSerializer.Meta.fields if field != 'download_url']
+
+_uploaded_at_field = serializers.DateTimeField()
+
+
+def serialize_file_values(rows, request):
+    """
+    Render File rows fetched with .values(*FILE_VALUES_FIELDS) in the same
+    shape as FileSerializer, without per-row serializer field dispatch
+    """
+    download_base = request.build_absolute_uri(reverse('file-list'))
+    to_datetime = _uploaded_at_field.to_representation
+    data = []
+    for row in rows:
+        item = dict(row)
+        item['id'] = str(row['id'])
+        item['uploaded_at'] = to_datetime(row['uploaded_at'])
+        item['download_url'] = f"{download_base}{item['id']}/download/"
+        data.append(item)
+    return data
@@ -0,0 +1,304 @@
+import base64
+import copy
+import hashlib
+import json
+import threading
+import warnings
+import fakeredis
+from django.conf import settings
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+from .cache import FileListCache
+from .models import File
+
+# Tests run against an in-process fake Redis, so the django-redis specific
+# paths (hash group, locks, Lua scripts) are exercised like in production
+FAKE_REDIS_SERVER = fakeredis.FakeServer()
+
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': 'redis://fakeredis:6379/1',
+        'OPTIONS': {
+            'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            'CONNECTION_POOL_KWARGS': {
+                'connection_class': fakeredis.FakeConnection,
+                'server': FAKE_REDIS_SERVER,
+            },
+        },
+        'KEY_PREFIX': 'file_hub_test',
+    }
+}
+
+def create_file(name, content, **kwargs):
+    return File.objects.create(
+        original_filename=name,
+        file_type='text/plain',
+        size=len(content),
+        file_hash=hashlib.sha256(content).hexdigest(),
+        file_content=content,
+        **kwargs
+    )
+
+def throttle_rates(anon):
+    rest_framework = copy.deepcopy(settings.REST_FRAMEWORK)
+    rest_framework['DEFAULT_THROTTLE_RATES']['anon'] = anon
+    return rest_framework
+
+@override_settings(CACHES=TEST_CACHES)
+class FileAPITestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+
+    @property
+    def redis(self):
+        return cache.client.get_client()
+
+class FileFilterTests(FileAPITestCase):
+    def setUp(self):
+        super().setUp()
+        create_file('small.txt', b'a')
+        create_file('large.txt', b'a' * 100)
+
+    def test_size_range(self):
+        response = self.client.get('/api/files/', {'min_size': '10', 'max_size': '1e3'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([f['original_filename'] for f in response.data['results']], ['large.txt'])
+
+    def test_non_finite_sizes_are_rejected(self):
+        for value in ['NaN', 'Infinity', '-Infinity', 'sNaN', 'abc']:
+            response = self.client.get('/api/files/', {'min_size': value})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, value)
+            self.assertEqual(response.data['min_size'], ['Enter a number.'])
+
+    def test_out_of_range_sizes_are_rejected(self):
+        response = self.client.get('/api/files/', {'max_size': '1e99999'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['max_size'], ['Ensure this value is less than or equal to 1e+50.'])
+
+        response = self.client.get('/api/files/', {'min_size': '-1e99999'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['min_size'], ['Ensure this value is greater than or equal to -1e+50.'])
+
+class KeysetPaginationTests(FileAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.files = [create_file(f'file{i}.txt', f'content{i}'.encode()) for i in range(5)]
+
+    def encode_cursor(self, position):
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+    def test_follows_cursor_through_all_files(self):
+        seen = []
+        url = '/api/files/?cursor=&page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen += [f['id'] for f in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(sorted(seen), sorted(str(f.id) for f in self.files))
+
+    def test_malformed_cursors_are_not_found(self):
+        cursors = [
+            'not-a-cursor',
+            self.encode_cursor(['2020-01-01T00:00:00+00:00', 5]),
+            self.encode_cursor([5, str(self.files[0].id)]),
+            self.encode_cursor(['2020-01-01T00:00:00+00:00']),
+            self.encode_cursor({'a': 1}),
+        ]
+        for cursor in cursors:
+            response = self.client.get('/api/files/', {'cursor': cursor})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, cursor)
+
+    def test_naive_cursor_is_treated_as_current_timezone(self):
+        cursor = self.encode_cursor(['2999-01-01T00:00:00', str(self.files[0].id)])
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', RuntimeWarning)
+            response = self.client.get('/api/files/', {'cursor': cursor})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 5)
+
+class ConditionalGetTests(FileAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.file = create_file('a.txt', b'content')
+
+    def test_matching_etag_returns_not_modified(self):
+        for url in ['/api/files/', '/api/files/storage_metrics/']:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            etag = response['ETag']
+
+            # A plain GET must not leave a copy in the page cache that would
+            # answer the conditional request instead of the view
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED, url)
+            self.assertEqual(response['ETag'], etag)
+
+    def test_invalid_requests_are_not_revalidated(self):
+        cases = [
+            ({'min_size': 'abc'}, status.HTTP_400_BAD_REQUEST),
+            ({'cursor': 'not-a-cursor'}, status.HTTP_404_NOT_FOUND),
+            ({'cursor': '', 'ordering': 'size'}, status.HTTP_400_BAD_REQUEST),
+        ]
+        for params, expected in cases:
+            response = self.client.get('/api/files/', params, HTTP_IF_NONE_MATCH='*')
+            self.assertEqual(response.status_code, expected, params)
+
+    def test_etag_changes_after_delete(self):
+        etag = self.client.get('/api/files/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/files/{self.file.id}/')
+
+        response = self.client.get('/api/files/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['count'], 0)
+
+    def test_update_invalidates_list_and_metrics(self):
+        original = create_file('original.txt', b'dup')
+        create_file('copy.txt', b'dup', is_duplicate=True, original_file=original)
+        list_etag = self.client.get('/api/files/')['ETag']
+        metrics = self.client.get('/api/files/storage_metrics/')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                f'/api/files/{original.id}/', {'original_filename': 'renamed.txt'}, format='json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get('/api/files/', HTTP_IF_NONE_MATCH=list_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('renamed.txt', [f['original_filename'] for f in response.data['results']])
+
+        response = self.client.get('/api/files/storage_metrics/', HTTP_IF_NONE_MATCH=metrics['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['duplicate_statistics'][0]['original_filename'], 'renamed.txt')
+
+class QueryCountTests(FileAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.original = create_file('original.txt', b'dup')
+        self.copy = create_file('copy.txt', b'dup', is_duplicate=True, original_file=self.original)
+
+    # Every request runs inside ATOMIC_REQUESTS, which adds a SAVEPOINT and a
+    # RELEASE SAVEPOINT around the single SELECT under TestCase
+
+    def test_retrieve_is_a_single_select(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/files/{self.original.id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_list_page_is_a_single_select(self):
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/files/')
+        self.assertEqual(response.data['count'], 2)
+
+    def test_duplicate_download_joins_its_original(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/files/{self.copy.id}/download/')
+            content = b''.join(response.streaming_content)
+        self.assertEqual(content, b'dup')
+
+class RedisCacheTests(FileAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.file = create_file('a.txt', b'content')
+        self.group_key = cache.make_key('file_list_cache')
+
+    def test_list_cache_hit_returns_same_body(self):
+        first = self.client.get('/api/files/')
+        self.assertEqual(self.redis.hlen(self.group_key), 1)
+
+        # Served from the msgpack-encoded hash entry without touching the table
+        with self.assertNumQueries(2):
+            second = self.client.get('/api/files/')
+        self.assertEqual(second.data, first.data)
+        self.assertGreater(self.redis.ttl(self.group_key), 0)
+
+    def test_links_follow_each_requests_own_query(self):
+        create_file('b.txt', b'other')
+
+        # Both spellings fold into one cache entry, but each response's links
+        # must keep the query the client actually sent
+        for params in [{'page_size': 1}, {'page_size': 1, 'cursor': ''}]:
+            self.redis.delete(self.group_key)
+            self.client.get('/api/files/', {**params, 'is_duplicate': 'false'})
+            response = self.client.get('/api/files/', {**params, 'is_duplicate': '0'})
+            self.assertEqual(self.redis.hlen(self.group_key), 1)
+            self.assertIn('is_duplicate=0', response.data['next'])
+            self.assertNotIn('is_duplicate=false', response.data['next'])
+
+    def hold_rebuild_lock(self):
+        """Evict the cached first page and take its rebuild lock, as a concurrent request would"""
+        self.client.get('/api/files/')
+        cache_key, = self.redis.hkeys(self.group_key)
+        value = self.redis.hget(self.group_key, cache_key)
+        self.redis.hdel(self.group_key, cache_key)
+        lock = FileListCache.get_lock(cache_key.decode())
+        self.assertTrue(lock.acquire(blocking=False))
+        self.addCleanup(FileListCache.release_lock, lock)
+        return cache_key, value
+
+    @override_settings(CACHE_LOCK_POLL_INTERVAL=0.01)
+    def test_waiter_is_served_the_rebuilt_entry(self):
+        cache_key, value = self.hold_rebuild_lock()
+        rebuild = threading.Timer(0.05, self.redis.hset, [self.group_key, cache_key, value])
+        rebuild.start()
+        self.addCleanup(rebuild.cancel)
+
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/files/')
+        self.assertEqual(response.data['count'], 1)
+
+    @override_settings(CACHE_LOCK_BLOCKING_TIMEOUT=0.05, CACHE_LOCK_POLL_INTERVAL=0.01)
+    def test_waiter_falls_back_to_the_database(self):
+        self.hold_rebuild_lock()
+
+        response = self.client.get('/api/files/')
+        self.assertEqual(response.data['count'], 1)
+        # Only the lock holder writes the entry
+        self.assertEqual(self.redis.hlen(self.group_key), 0)
+
+    def test_later_pages_do_not_extend_the_group_ttl(self):
+        self.client.get('/api/files/')
+        self.redis.expire(self.group_key, 100)
+
+        self.client.get('/api/files/', {'page_size': 5})
+        self.assertEqual(self.redis.hlen(self.group_key), 2)
+        self.assertTrue(0 < self.redis.ttl(self.group_key) <= 100)
+
+    def test_delete_unlinks_the_cache_group(self):
+        self.client.get('/api/files/')
+        self.assertTrue(self.redis.exists(self.group_key))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/files/{self.file.id}/')
+        self.assertFalse(self.redis.exists(self.group_key))
+        self.assertEqual(self.client.get('/api/files/').data['count'], 0)
+
+    def test_invalidation_waits_for_commit(self):
+        etag = self.client.get('/api/files/')['ETag']
+
+        # Until the delete commits, readers still see the old rows, so the
+        # cached lists and their revision must stay as they are
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.delete(f'/api/files/{self.file.id}/')
+            self.assertTrue(self.redis.exists(self.group_key))
+            self.assertEqual(self.client.get('/api/files/')['ETag'], etag)
+
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        self.assertFalse(self.redis.exists(self.group_key))
+        self.assertNotEqual(self.client.get('/api/files/')['ETag'], etag)
+
+    @override_settings(REST_FRAMEWORK=throttle_rates('2/min'))
+    def test_anon_requests_are_throttled(self):
+        for _ in range(2):
+            self.assertEqual(self.client.get('/api/files/').status_code, status.HTTP_200_OK)
+
+        response = self.client.get('/api/files/')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertTrue(0 < int(response['Retry-After']) <= 60)
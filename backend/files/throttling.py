@@ -0,0 +1,67 @@
+import logging
+from django.core.cache import cache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+class SingleFlightThrottle(BaseThrottle):
+    """
+    Fixed window rate limit that costs a single Redis round-trip per request.
+    Anonymous requests use the 'anon' rate and authenticated ones the 'user'
+    rate from DEFAULT_THROTTLE_RATES.
+    """
+    # Increment the bucket and start its window atomically, returning the
+    # request count and the seconds left in the window
+    SCRIPT = """
+local count = redis.call('INCR', KEYS[1])
+if count == 1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+return {count, redis.call('TTL', KEYS[1])}
+"""
+    cache_format = 'throttle_bucket_%(scope)s_%(ident)s'
+    durations = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+    _script = None
+
+    def __init__(self):
+        self.wait_seconds = None
+
+    def parse_rate(self, rate):
+        """Parse a rate like '100/hour' into (num_requests, duration in seconds)"""
+        num, period = rate.split('/')
+        return int(num), self.durations[period[0]]
+
+    def get_script(self, client):
+        # Registered once; redis-py calls it with EVALSHA and reloads it if needed
+        if SingleFlightThrottle._script is None:
+            SingleFlightThrottle._script = client.register_script(self.SCRIPT)
+        return SingleFlightThrottle._script
+
+    def allow_request(self, request, view):
+        if request.user and request.user.is_authenticated:
+            scope, ident = 'user', request.user.pk
+        else:
+            scope, ident = 'anon', self.get_ident(request)
+
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+        if rate is None:
+            return True
+        num_requests, duration = self.parse_rate(rate)
+
+        key = cache.make_key(self.cache_format % {'scope': scope, 'ident': ident})
+        try:
+            client = cache.client.get_client(write=True)
+            count, ttl = self.get_script(client)(keys=[key], args=[duration], client=client)
+        except Exception as e:
+            # Redis is optional; don't turn a cache outage into rejected requests
+            logger.error(f"Error checking throttle: {str(e)}")
+            return True
+
+        if count <= num_requests:
+            return True
+        self.wait_seconds = ttl if ttl > 0 else duration
+        return False
+
+    def wait(self):
+        return self.wait_seconds
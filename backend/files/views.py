@@ -4,20 +4,34 @@ from rest_framework.response import Response
 from rest_framework.decorators import action
 from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
-from django.db.models import Q, Sum, Count, F, ExpressionWrapper, FloatField
+from django.db import connection
+from django.db.models import Q, Sum, Count, F, ExpressionWrapper, FloatField, Window
 from django.db.models.functions import Cast
 from django_filters import rest_framework as django_filters
 import os
 from .models import File
-from .serializers import FileSerializer
-from django.http import HttpResponse
+from .serializers import FileSerializer, FILE_VALUES_FIELDS, serialize_file_values
+from django.http import FileResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from django.core.paginator import Page
 from rest_framework.pagination import PageNumberPagination
-from rest_framework.throttling import UserRateThrottle, AnonRateThrottle
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 from django.core.cache import cache
 from .cache import FileListCache
+from .throttling import SingleFlightThrottle
 from django.conf import settings
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+import base64
+import io
 import json
 import logging
+import time
+import uuid
 
 # Create your views here.
 
@@ -37,11 +51,114 @@ class FileFilter(django_filters.FilterSet):
         fields = ['filename', 'file_type', 'is_duplicate', 'min_size', 'max_size', 
                  'uploaded_after', 'uploaded_before']
 
+def _to_bool(value):
+    """Parse booleans the way django-filter's BooleanWidget does; unknown values don't filter"""
+    return {'1': True, 'true': True, '0': False, 'false': False}.get(value.lower())
+
+# Same bound django-filter's NumberFilter validates against
+NUMBER_FILTER_LIMIT = Decimal('1e50')
+
+def _to_number(value):
+    try:
+        number = Decimal(value)
+    except InvalidOperation:
+        raise ValueError('Enter a number.')
+    if not number.is_finite():
+        raise ValueError('Enter a number.')
+    if number > NUMBER_FILTER_LIMIT:
+        raise ValueError('Ensure this value is less than or equal to 1e+50.')
+    if number < -NUMBER_FILTER_LIMIT:
+        raise ValueError('Ensure this value is greater than or equal to -1e+50.')
+    return number
+
+def _to_datetime(value):
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            date = parse_date(value)
+            parsed = datetime.combine(date, datetime.min.time()) if date else None
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValueError('Enter a valid date/time.')
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+# Precomputed query param -> (ORM lookup, coercion) table equivalent to
+# FileFilter, so list requests don't build a FilterSet and its form each time
+FILTER_MAP = {
+    'filename': ('original_filename__icontains', str),
+    'file_type': ('file_type__iexact', str),
+    'is_duplicate': ('is_duplicate', _to_bool),
+    'min_size': ('size__gte', _to_number),
+    'max_size': ('size__lte', _to_number),
+    'uploaded_after': ('uploaded_at__gte', _to_datetime),
+    'uploaded_before': ('uploaded_at__lte', _to_datetime),
+}
+
 class CustomPagination(PageNumberPagination):
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
 
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Read the total count off the page query with COUNT(*) OVER () instead
+        of issuing a separate SELECT COUNT(*)
+        """
+        page_size = self.get_page_size(request)
+        page_number = request.query_params.get(self.page_query_param) or 1
+        if (
+            not page_size
+            or page_number in self.last_page_strings
+            or queryset.query.distinct
+            or not connection.features.supports_over_clause
+        ):
+            return super().paginate_queryset(queryset, request, view)
+
+        try:
+            page_number = int(page_number)
+        except ValueError:
+            page_number = 0
+        if page_number < 1:
+            # Let the regular path raise the usual NotFound
+            return super().paginate_queryset(queryset, request, view)
+
+        offset = (page_number - 1) * page_size
+        rows = list(
+            queryset.annotate(_total=Window(expression=Count('*')))[offset:offset + page_size]
+        )
+        if not rows:
+            # Empty table or past the last page; no row carries the total
+            return super().paginate_queryset(queryset, request, view)
+
+        for row in rows:
+            total = row.pop('_total') if isinstance(row, dict) else row.__dict__.pop('_total')
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = total
+        self.page = Page(rows, page_number, paginator)
+        self.request = request
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        return rows
+
+    def get_cache_state(self):
+        """Pagination state needed to rebuild the response for another request"""
+        return {'count': self.page.paginator.count, 'number': self.page.number}
+
+    def get_cached_response(self, request, state, data):
+        """
+        Rebuild a paginated response from cached state. Links are built from
+        the current request rather than the one that populated the cache.
+        """
+        paginator = self.django_paginator_class([], self.get_page_size(request))
+        paginator.count = state['count']
+        self.page = Page(data, state['number'], paginator)
+        self.request = request
+        return self.get_paginated_response(data)
+
     def get_paginated_response(self, data):
         return Response({
             'next': self.get_next_link(),
@@ -52,11 +169,104 @@ class CustomPagination(PageNumberPagination):
             'results': data
         })
 
+class KeysetPagination(CustomPagination):
+    """
+    Seek pagination on (uploaded_at, id) when a `cursor` is supplied.
+    Requests without a cursor keep the page number behaviour.
+    """
+    cursor_query_param = 'cursor'
+    keyset_ordering = ('-uploaded_at', '-id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.cursor_query_param in request.query_params
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        position = self.get_position(request)
+        self.request = request
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.keyset_ordering)
+
+        if position is not None:
+            uploaded_at, file_id = position
+            queryset = queryset.filter(
+                Q(uploaded_at__lt=uploaded_at) | Q(uploaded_at=uploaded_at, id__lt=file_id)
+            )
+
+        # Fetch one extra row to find out whether there is a next page
+        rows = list(queryset[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        self.next_cursor = self.encode_cursor(rows[-1]) if self.has_next else None
+        return rows
+
+    def get_position(self, request):
+        """Validate the keyset parameters and return the decoded cursor position"""
+        ordering = request.query_params.get('ordering')
+        if ordering not in (None, '', '-uploaded_at'):
+            raise ValidationError({'ordering': ['Cursor pagination only supports ordering by -uploaded_at']})
+        return self.decode_cursor(request.query_params[self.cursor_query_param])
+
+    def encode_cursor(self, row):
+        if not isinstance(row, dict):
+            row = {'uploaded_at': row.uploaded_at, 'id': row.id}
+        position = json.dumps([row['uploaded_at'].isoformat(), str(row['id'])])
+        return base64.urlsafe_b64encode(position.encode()).decode()
+
+    def decode_cursor(self, cursor):
+        """Decode a cursor into an (uploaded_at, id) tuple; an empty cursor starts from the top"""
+        if not cursor:
+            return None
+        try:
+            uploaded_at, file_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if not isinstance(uploaded_at, str) or not isinstance(file_id, str):
+                raise ValueError(cursor)
+            uploaded_at = datetime.fromisoformat(uploaded_at)
+            file_id = uuid.UUID(file_id)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if timezone.is_naive(uploaded_at):
+            uploaded_at = timezone.make_aware(uploaded_at)
+        return uploaded_at, file_id
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_cache_state(self):
+        if not self.keyset:
+            return super().get_cache_state()
+        return {'next_cursor': self.next_cursor}
+
+    def get_cached_response(self, request, state, data):
+        self.keyset = self.cursor_query_param in request.query_params
+        if not self.keyset:
+            return super().get_cached_response(request, state, data)
+        self.request = request
+        self.next_cursor = state['next_cursor']
+        self.has_next = self.next_cursor is not None
+        return self.get_paginated_response(data)
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'next_cursor': self.next_cursor,
+            'results': data
+        })
+
 class FileViewSet(viewsets.ModelViewSet):
     queryset = File.objects.all()
     serializer_class = FileSerializer
-    pagination_class = CustomPagination
-    throttle_classes = [AnonRateThrottle, UserRateThrottle]
+    pagination_class = KeysetPagination
+    throttle_classes = [SingleFlightThrottle]
     filter_backends = [
         django_filters.DjangoFilterBackend,
         filters.SearchFilter,
@@ -67,66 +277,196 @@ class FileViewSet(viewsets.ModelViewSet):
     ordering_fields = ['uploaded_at', 'size', 'original_filename']
     ordering = ['-uploaded_at']
 
+    def get_queryset(self):
+        if self.action == 'download':
+            # Only downloads need the stored bytes, of this file or its original
+            return File.objects.select_related('original_file').only(
+                'file_content',
+                'file_type',
+                'original_filename',
+                'is_duplicate',
+                'original_file',
+                'original_file__file_content'
+            )
+        return File.objects.defer('file_content')
+
+    def filter_queryset(self, queryset):
+        """
+        Apply FILTER_MAP lookups in a single filter() call, then the remaining
+        backends. DjangoFilterBackend stays listed for browsable API rendering.
+        """
+        lookups = self.get_filter_lookups()
+        if lookups:
+            queryset = queryset.filter(**lookups)
+
+        for backend in self.filter_backends:
+            if backend is django_filters.DjangoFilterBackend:
+                continue
+            queryset = backend().filter_queryset(self.request, queryset, self)
+        return queryset
+
+    def get_filter_lookups(self):
+        """Parse the FILTER_MAP query parameters into ORM lookups, raising ValidationError on bad input"""
+        lookups = {}
+        errors = {}
+        for param, (lookup, coerce) in FILTER_MAP.items():
+            value = self.request.query_params.get(param, '').strip()
+            if not value:
+                continue
+            try:
+                value = coerce(value)
+            except ValueError as e:
+                errors[param] = [str(e)]
+                continue
+            if value is not None:
+                lookups[lookup] = value
+        if errors:
+            raise ValidationError(errors)
+        return lookups
+
     def list(self, request, *args, **kwargs):
-        # Extract all query parameters
+        # Extract all query parameters that affect the result
         filters = {
-            'search': request.query_params.get('search', ''),
-            'file_type': request.query_params.get('file_type', ''),
-            'is_duplicate': request.query_params.get('is_duplicate'),
-            'min_size': request.query_params.get('min_size'),
-            'max_size': request.query_params.get('max_size'),
-            'uploaded_after': request.query_params.get('uploaded_after'),
-            'uploaded_before': request.query_params.get('uploaded_before'),
+            name: request.query_params.get(name)
+            for name in ['search', *FileFilter.Meta.fields]
         }
-        
-        # Get pagination parameters
-        page = self.paginator.get_page_number(request, self.paginator)
-        page_size = request.query_params.get('page_size', self.pagination_class.page_size)
-        
+
+        # Get pagination parameters; a keyset cursor takes the place of the page number
+        if self.paginator.cursor_query_param in request.query_params:
+            page = f"cursor:{request.query_params[self.paginator.cursor_query_param]}"
+        else:
+            page = request.query_params.get(self.paginator.page_query_param) or 1
+        page_size = self.paginator.get_page_size(request)
+
         # Get ordering
         ordering = request.query_params.get('ordering', '-uploaded_at')
 
+        # Reject bad filters and cursors before answering a conditional
+        # request, so If-None-Match can't turn a 400 or 404 into a 304
+        self.get_filter_lookups()
+        if self.paginator.cursor_query_param in request.query_params:
+            self.paginator.get_position(request)
+
+        # The list only changes when the revision does, so it doubles as the ETag
+        revision = FileListCache.get_revision()
+        etag = FileListCache.get_etag(revision)
+        if self.etag_matches(request, etag):
+            return self.revalidated(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
+
         # Generate cache key
-        cache_key = FileListCache.generate_cache_key(filters, page, page_size, ordering)
-        logger.info(f"Generated cache key: {cache_key}")
-        
+        cache_key = FileListCache.generate_cache_key(filters, page, page_size, ordering, revision)
+        payload = self.cached_list(request, cache_key)
+        return self.revalidated(self.list_response(request, payload), etag)
+
+    def cached_list(self, request, cache_key):
+        """Return the cacheable file list payload, rebuilding it on a miss"""
         # Try to get data from cache
         cached_data = FileListCache.get_cached_data(cache_key)
         if cached_data is not None:
-            logger.info(f"Cache hit for key: {cache_key}")
-            return Response(cached_data)
+            return cached_data
 
-        logger.info(f"Cache miss for key: {cache_key}")
-        # If not in cache, get from database
-        response = super().list(request, *args, **kwargs)
-        
-        # Store in cache
+        # Only one request per cache key rebuilds the page. The others poll the
+        # cache rather than queue on the lock, so a rebuild that fails to store
+        # its result doesn't send them to the database one after another.
         try:
-            FileListCache.set_cached_data(cache_key, response.data)
-            logger.info(f"Successfully stored data in cache with key: {cache_key}")
-            
-            # Verify the data was stored
-            verification = FileListCache.get_cached_data(cache_key)
-            if verification is not None:
-                logger.info("Cache verification successful")
-            else:
-                logger.error("Cache verification failed - data not stored")
+            lock = FileListCache.get_lock(cache_key)
         except Exception as e:
-            logger.error(f"Error storing data in cache: {str(e)}")
-        
+            logger.error(f"Error creating cache lock: {str(e)}")
+            lock = None
+
+        deadline = time.monotonic() + settings.CACHE_LOCK_BLOCKING_TIMEOUT
+        while lock is not None:
+            try:
+                acquired = lock.acquire(blocking=False)
+            except Exception as e:
+                logger.error(f"Error acquiring cache lock: {str(e)}")
+                break
+
+            if acquired:
+                try:
+                    payload = self.list_values(request)
+                    # Store in cache; set_cached_data logs its own failures
+                    FileListCache.set_cached_data(cache_key, payload)
+                finally:
+                    FileListCache.release_lock(lock)
+                return payload
+
+            if time.monotonic() >= deadline:
+                break
+            time.sleep(settings.CACHE_LOCK_POLL_INTERVAL)
+            cached_data = FileListCache.get_cached_data(cache_key)
+            if cached_data is not None:
+                return cached_data
+
+        # Redis is unavailable or the rebuild is taking too long; serve from
+        # the database without touching the cache
+        return self.list_values(request)
+
+    @staticmethod
+    def revalidated(response, etag):
+        """
+        Attach the ETag and keep the response out of the site-wide page cache,
+        which would otherwise answer conditional requests with a stale 200
+        """
+        response['ETag'] = etag
+        patch_cache_control(response, no_cache=True, max_age=0)
         return response
 
-    def create(self, request, *args, **kwargs):
-        response = super().create(request, *args, **kwargs)
+    @staticmethod
+    def etag_matches(request, etag):
+        """Whether the request's If-None-Match already covers the given weak ETag"""
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == '*':
+            return True
+        # Weak comparison: ignore the W/ prefix on both sides
+        tags = [tag.removeprefix('W/') for tag in parse_etags(if_none_match)]
+        return etag.removeprefix('W/') in tags
+
+    def list_values(self, request):
+        """
+        Filter and paginate the file list as .values() rows rather than model
+        instances. Returns the rows with the pagination state instead of the
+        response envelope: requests that share a cache key can differ in their
+        raw query, and next/previous links must echo each request's own.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        queryset = queryset.values(*FILE_VALUES_FIELDS)
+
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return {'pagination': None, 'results': serialize_file_values(queryset, request)}
+        return {
+            'pagination': self.paginator.get_cache_state(),
+            'results': serialize_file_values(page, request)
+        }
+
+    def list_response(self, request, payload):
+        """Wrap a list payload in the response envelope for the current request"""
+        if payload['pagination'] is None:
+            return Response(payload['results'])
+        return self.paginator.get_cached_response(request, payload['pagination'], payload['results'])
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
         # Invalidate the file list cache when a new file is created
-        cache.delete_pattern("file_list:*")
-        return response
+        FileListCache.invalidate_on_commit(duplicates=serializer.instance.original_file_id is not None)
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        instance = serializer.instance
+        # Invalidate the file list cache when a file is changed; the top
+        # duplicated files show the names and sizes of linked files
+        FileListCache.invalidate_on_commit(
+            duplicates=instance.original_file_id is not None or instance.duplicates.exists()
+        )
 
-    def destroy(self, request, *args, **kwargs):
-        response = super().destroy(request, *args, **kwargs)
+    def perform_destroy(self, instance):
+        changes_duplicates = instance.original_file_id is not None or instance.duplicates.exists()
+        super().perform_destroy(instance)
         # Invalidate the file list cache when a file is deleted
-        cache.delete_pattern("file_list:*")
-        return response
+        FileListCache.invalidate_on_commit(duplicates=changes_duplicates)
 
     @action(detail=True, methods=['get'])
     def download(self, request, pk=None):
@@ -141,65 +481,95 @@ class FileViewSet(viewsets.ModelViewSet):
         else:
             content = file_obj.file_content
 
-        response = HttpResponse(
-            content,
-            content_type=file_obj.file_type
+        # Stream the content in chunks rather than copying it into the response body
+        return FileResponse(
+            io.BytesIO(content or b''),
+            content_type=file_obj.file_type,
+            as_attachment=True,
+            filename=file_obj.original_filename
         )
-        response['Content-Disposition'] = f'attachment; filename="{file_obj.original_filename}"'
-        return response
 
     @action(detail=False, methods=['get'])
     def duplicates(self, request):
         """
         Get all files that have duplicates
         """
-        files_with_duplicates = File.objects.filter(
-            duplicates__isnull=False
-        ).distinct()
-        serializer = self.get_serializer(files_with_duplicates, many=True)
-        return Response(serializer.data)
+        # One grouped JOIN instead of DISTINCT plus per-row serialization
+        files_with_duplicates = (
+            File.objects.annotate(duplicate_count=Count('duplicates'))
+            .filter(duplicate_count__gt=0)
+            .order_by('-uploaded_at')
+            .values(*FILE_VALUES_FIELDS, 'duplicate_count')
+        )
+        return Response(serialize_file_values(files_with_duplicates, request))
 
-    @action(detail=False, methods=['get'])
-    def storage_metrics(self, request):
-        """Get detailed storage metrics"""
-        # Try to get from cache
-        cache_key = "storage_metrics"
-        cached_data = cache.get(cache_key)
-        if cached_data is not None:
-            return Response(cached_data)
+    def _compute_summary(self, revision):
+        """Summary and efficiency metrics, cached per file list revision"""
+        return cache.get_or_set(
+            f"metrics:summary:{revision}",
+            self._calculate_summary,
+            timeout=settings.CACHE_TTL
+        )
+
+    def _compute_top_duplicated(self, revision):
+        """
+        Most duplicated files, cached per duplicates revision. That revision only
+        moves when duplicate links change, so a longer TTL is safe.
+        """
+        return cache.get_or_set(
+            f"metrics:top5:{revision}",
+            self._calculate_top_duplicated,
+            timeout=settings.CACHE_TTL * 5
+        )
 
-        # If not in cache, calculate metrics
-        original_files = File.objects.filter(is_duplicate=False)
-        duplicate_files = File.objects.filter(is_duplicate=True)
+    def _calculate_summary(self):
+        # Calculate all counts and sizes in a single query
+        totals = File.objects.aggregate(
+            total_files=Count('id'),
+            unique_files=Count('id', filter=Q(is_duplicate=False)),
+            duplicate_files=Count('id', filter=Q(is_duplicate=True)),
+            actual_storage=Sum('size', filter=Q(is_duplicate=False)),
+            theoretical_storage=Sum('size'),
+            # Files referencing an original, i.e. the sum of duplicate counts over originals
+            linked_duplicates=Count('id', filter=Q(original_file__is_duplicate=False))
+        )
 
         # Basic counts
-        total_files = File.objects.count()
-        total_unique_files = original_files.count()
-        total_duplicates = duplicate_files.count()
-        
+        total_files = totals['total_files']
+        total_unique_files = totals['unique_files']
+        total_duplicates = totals['duplicate_files']
+
         # Storage calculations
-        actual_storage = original_files.aggregate(total=Sum('size'))['total'] or 0
-        theoretical_storage = actual_storage + (duplicate_files.aggregate(total=Sum('size'))['total'] or 0)
-        
+        actual_storage = totals['actual_storage'] or 0
+        theoretical_storage = totals['theoretical_storage'] or 0
+
         # Calculate originality metrics
         originality_percentage = (total_unique_files / total_files * 100) if total_files > 0 else 100
         storage_efficiency = (actual_storage / theoretical_storage * 100) if theoretical_storage > 0 else 100
-        
+
         # Calculate average duplication factor
-        files_with_duplicates = (
-            File.objects.filter(is_duplicate=False)
-            .annotate(duplicate_count=Count('duplicates'))
-            .aggregate(
-                total_duplicates=Sum('duplicate_count'),
-                file_count=Count('id')
-            )
-        )
         avg_duplication_factor = (
-            (files_with_duplicates['total_duplicates'] or 0) / 
-            files_with_duplicates['file_count']
-            if files_with_duplicates['file_count'] > 0 else 0
+            totals['linked_duplicates'] / total_unique_files
+            if total_unique_files > 0 else 0
         )
 
+        return {
+            'summary_metrics': {
+                'total_files': total_files,
+                'unique_files': total_unique_files,
+                'duplicate_files': total_duplicates,
+                'actual_storage_bytes': actual_storage,
+                'theoretical_storage_bytes': theoretical_storage,
+                'original_storage_bytes': actual_storage,
+            },
+            'efficiency_metrics': {
+                'originality_percentage': round(originality_percentage, 2),  # Percentage of files that are original
+                'storage_efficiency': round(storage_efficiency, 2),  # Percentage of storage used by original files
+                'average_duplication_factor': round(avg_duplication_factor + 1, 2),  # Average copies per file (including original)
+            },
+        }
+
+    def _calculate_top_duplicated(self):
         # Get most duplicated files
         top_duplicated = (
             File.objects.filter(is_duplicate=False)
@@ -218,34 +588,35 @@ class FileViewSet(viewsets.ModelViewSet):
                 'originality_factor'
             )[:5]
         )
+        return [
+            {
+                **stat,
+                'originality_percentage': round(stat['originality_factor'] * 100, 2)
+            }
+            for stat in top_duplicated
+        ]
 
-        response_data = {
-            'summary_metrics': {
-                'total_files': total_files,
-                'unique_files': total_unique_files,
-                'duplicate_files': total_duplicates,
-                'actual_storage_bytes': actual_storage,
-                'theoretical_storage_bytes': theoretical_storage,
-                'original_storage_bytes': actual_storage,
-            },
-            'efficiency_metrics': {
-                'originality_percentage': round(originality_percentage, 2),  # Percentage of files that are original
-                'storage_efficiency': round(storage_efficiency, 2),  # Percentage of storage used by original files
-                'average_duplication_factor': round(avg_duplication_factor + 1, 2),  # Average copies per file (including original)
-            },
-            'duplicate_statistics': [
-                {
-                    **stat,
-                    'originality_percentage': round(stat['originality_factor'] * 100, 2)
-                }
-                for stat in top_duplicated
-            ]
-        }
+    @action(detail=False, methods=['get'])
+    def storage_metrics(self, request):
+        """Get detailed storage metrics"""
+        # Every change that affects the metrics bumps the file list revision,
+        # so it doubles as the ETag
+        revision = FileListCache.get_revision()
+        etag = FileListCache.get_etag(revision)
+        if self.etag_matches(request, etag):
+            return self.revalidated(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
 
-        # Store in cache
-        cache.set(cache_key, response_data, timeout=settings.CACHE_TTL)
+        # Each part is cached under its own revision, so uploads that don't
+        # touch duplicates don't recompute the top duplicated files
+        summary = self._compute_summary(revision)
+        top_duplicated = self._compute_top_duplicated(
+            FileListCache.get_revision(FileListCache.DUPLICATES_REVISION_KEY)
+        )
 
-        return Response(response_data)
+        return self.revalidated(Response({
+            **summary,
+            'duplicate_statistics': top_duplicated
+        }), etag)
 
     @action(detail=False, methods=['get'])
     def test_cache(self, request):